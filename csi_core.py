@@ -0,0 +1,305 @@
+'''
+    Shared capture, processing and plotting helpers for the real-time
+    CSI scripts (csi_realTimeAmp.py, csi_realTimePhase.py).
+    matplotlib and scapy are imported lazily so capture-only code
+    does not pay for them at startup.
+'''
+import math
+import queue
+import signal
+import sys
+import threading
+from datetime import datetime
+
+import numpy as np
+import pcap
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Global configuration
+BANDWIDTH = 20
+NSUB = int(BANDWIDTH * 3.2)
+selected_mac = '5c0214fb6552'
+show_packet_length = 100
+GAP_PACKET_NUM = 20
+PLOT_INTERVAL = 1 / 30  # seconds between redraws
+MIN_DT = 0.1  # at most one packet is kept per MIN_DT time bucket
+
+# Fixed offsets into an Ethernet + IPv4 (no options) + UDP CSI frame.
+# The UDP payload holds 4 magic bytes, the 6 byte MAC address, then
+# sequence number, core/spatial stream, chanspec and chip version
+# (2 bytes each) before the CSI samples.
+UDP_PAYLOAD_OFF = 14 + 20 + 8
+MAC_OFF = UDP_PAYLOAD_OFF + 4
+CSI_OFF = MAC_OFF + 6 + 8
+
+# Fixed packet-index x axis shared by every real-time line
+_X = np.arange(0, show_packet_length, 1)
+
+def get_mac():
+    """
+    Scans the network to find MAC addresses.
+    Returns the first MAC address found without colons.
+    """
+    from scapy.all import ARP, Ether, srp
+
+    target_ip = "192.168.1.1/16"
+    arp = ARP(pdst=target_ip)
+    ether = Ether(dst="ff:ff:ff:ff:ff:ff")
+    packet = ether / arp
+    result = srp(packet, timeout=3, verbose=False)[0]
+
+    for sent, received in result:
+        print(f"IP: {received.psrc}, MAC: {received.hwsrc}")
+    return result[0][1].hwsrc.replace(":","") if result else None
+
+def _csi_amp_hypot(buf, out):
+    """
+    Computes amplitudes of interleaved int16 I/Q samples into out with NumPy.
+    Real and imaginary parts are split into float32 columns and the fftshift
+    is applied by writing each half of the spectrum to the other half of out.
+    """
+    half = out.shape[0] // 2
+    iq = buf.reshape(-1, 2)
+    re = iq[:, 0].astype(np.float32)
+    im = iq[:, 1].astype(np.float32)
+    np.hypot(re[half:], im[half:], out=out[:half])
+    np.hypot(re[:half], im[:half], out=out[half:])
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _csi_amp(buf, out):
+        """
+        Computes amplitudes of interleaved int16 I/Q samples into out.
+        The fftshift is applied through the source index instead of a copy.
+        """
+        n = out.shape[0]
+        half = n // 2
+        for k in range(n):
+            j = (k + half) % n
+            re = np.float32(buf[2 * j])
+            im = np.float32(buf[2 * j + 1])
+            out[k] = math.sqrt(re * re + im * im)
+else:
+    _csi_amp = _csi_amp_hypot
+
+def process_csi_data(csi, bandwidth):
+    """
+    Processes raw CSI data into amplitude data.
+    Returns a new float32 array so it can be handed to other threads.
+    """
+    nsub = int(bandwidth * 3.2)
+    out = np.empty(nsub, dtype=np.float32)
+
+    # Convert CSI bytes to numpy array without copying
+    _csi_amp(np.frombuffer(csi, dtype=np.int16, count=nsub * 2), out)
+    return out
+
+def process_csi_phase(csi, bandwidth):
+    """
+    Processes raw CSI data into float32 phase data in degrees.
+    """
+    nsub = int(bandwidth * 3.2)
+    half = nsub // 2
+    out = np.empty(nsub, dtype=np.float32)
+
+    iq = np.frombuffer(csi, dtype=np.int16, count=nsub * 2).reshape(-1, 2)
+    re = iq[:, 0].astype(np.float32)
+    im = iq[:, 1].astype(np.float32)
+
+    # Apply the fftshift by writing each half of the spectrum to the other half of out
+    np.arctan2(im[half:], re[half:], out=out[:half])
+    np.arctan2(im[:half], re[:half], out=out[half:])
+    return np.degrees(out, out=out)
+
+def setup_plot(title, ylabel, ylim, gap_label):
+    """
+    Sets up the matplotlib plot for real-time visualization.
+    Returns the figure, axis, line list, text object and the
+    (NSUB, show_packet_length) ring buffer backing the lines.
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    y_buf = np.zeros((NSUB, show_packet_length), dtype=np.float32)
+    line_list = []
+
+    for y in y_buf:
+        line, = ax.plot(_X, y, alpha=0.5, animated=True)
+        line_list.append(line)
+
+    plt.title(f'{title}', fontsize=18)
+    plt.ylabel(ylabel, fontsize=16)
+    plt.xlabel('Packet', fontsize=16)
+    plt.ylim(*ylim)
+
+    # Inside the axes so the animation's blit of ax.bbox covers it
+    txt = ax.text(0.02, 0.97, f'{gap_label} Min-Max Gap: None', fontsize=14,
+                  va='top', transform=ax.transAxes, animated=True)
+
+    return fig, ax, line_list, txt, y_buf
+
+def update_buffers(y_buf, cursor, csi_data, minmax_lo, minmax_hi, gap_count):
+    """
+    Stores new CSI data in the ring buffer and updates the min-max range.
+    y_buf is a ring buffer and cursor the column of the latest packet.
+    minmax_lo/minmax_hi hold the per-subcarrier range of the current
+    GAP_PACKET_NUM window and are updated in place.
+    """
+    cursor = (cursor + 1) % show_packet_length
+    y_buf[:, cursor] = csi_data
+
+    # Update min-max values, starting a new window when gap_count wraps
+    if gap_count == 0:
+        minmax_lo.fill(np.inf)
+        minmax_hi.fill(-np.inf)
+    np.minimum(minmax_lo, csi_data, out=minmax_lo)
+    np.maximum(minmax_hi, csi_data, out=minmax_hi)
+
+    return (gap_count + 1) % GAP_PACKET_NUM, cursor
+
+def update_plot(line_list, y_buf, cursor, minmax_lo, minmax_hi, txt, gap_label):
+    """
+    Updates the plot with the buffered CSI data and min-max gap information.
+    """
+    # Oldest packet first so the newest one stays on the right edge
+    y_view = np.roll(y_buf, -cursor - 1, axis=1)
+    for line, y in zip(line_list, y_view):
+        line.set_ydata(y)
+
+    # Calculate and display gap
+    gap = float((minmax_hi - minmax_lo).max())
+
+    txt.set_text(f'{gap_label} Min-Max Gap: {gap}')
+
+    return txt
+
+def sniffing_capture(nicname, mac_address, process, queues, stop_event):
+    """
+    Capture thread: parses CSI packets with process(csi, bandwidth) and
+    puts (datetime, values) on every queue.
+    Sets stop_event on exit, including on errors, so the plot closes too.
+    """
+    sniffer = None
+    try:
+        print(f'Start Sniffing... @ {nicname}, UDP, Port 5500')
+        sniffer = pcap.pcap(name=nicname, promisc=True, immediate=True, timeout_ms=50)
+        sniffer.setfilter('udp and port 5500')
+
+        mac_bytes = bytes.fromhex(mac_address)
+        before_ts = 0.0
+
+        def on_packet(ts, pkt):
+            nonlocal before_ts
+
+            # Keep one packet per MIN_DT time bucket, comparing against the last accepted one
+            if int(ts / MIN_DT) == int(before_ts / MIN_DT):
+                return
+
+            # Slice the UDP payload in place instead of parsing the headers
+            mv = memoryview(pkt)
+
+            # Check MAC address (memoryview compares by value, no copy needed)
+            if mv[MAC_OFF:MAC_OFF + 6] != mac_bytes:
+                return
+
+            # Extract and process CSI data
+            csi_data = process(mv[CSI_OFF:], BANDWIDTH)
+            item = (datetime.now(), csi_data)
+            for q in queues:
+                q.put(item)
+            before_ts = ts
+
+        # dispatch returns after timeout_ms even without traffic, unlike iterating
+        # the handle, so the stop flag is also checked while the link is idle
+        while not stop_event.is_set():
+            sniffer.dispatch(-1, on_packet)
+    finally:
+        stop_event.set()
+        if sniffer is not None:
+            sniffer.close()
+
+def wait_for_stop_key(stop_event):
+    """
+    Stdin thread: sets stop_event once 's' is entered.
+    """
+    for line in sys.stdin:
+        if line.strip() == 's':
+            print("Stop Collecting...")
+            stop_event.set()
+            return
+
+def run_realtime_plot(nicname, mac_address, process, ylabel, ylim, gap_label, extra_queues=()):
+    """
+    Captures CSI packets on a worker thread and plots them in real-time.
+    Every (datetime, values) item is also put on extra_queues.
+    Returns when the window is closed, 's' is entered or Ctrl+C is pressed.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+
+    plot_queue = queue.SimpleQueue()
+    stop_event = threading.Event()
+    capture_thread = threading.Thread(
+        target=sniffing_capture,
+        args=(nicname, mac_address, process, (plot_queue, *extra_queues), stop_event),
+        daemon=True)
+    stdin_thread = threading.Thread(target=wait_for_stop_key, args=(stop_event,), daemon=True)
+
+    # Stop from a signal handler instead of polling the keyboard per packet
+    def on_sigint(signum, frame):
+        print("Stop Collecting...")
+        stop_event.set()
+    previous_handler = signal.signal(signal.SIGINT, on_sigint)
+
+    fig, ax, line_list, txt, y_buf = setup_plot(mac_address, ylabel, ylim, gap_label)
+
+    minmax_lo = np.full(NSUB, np.inf, dtype=np.float32)
+    minmax_hi = np.full(NSUB, -np.inf, dtype=np.float32)
+    gap_count = 0
+    cursor = show_packet_length - 1
+
+    def update_frame(frame):
+        nonlocal gap_count, cursor, txt
+
+        # Buffer every queued packet, then redraw once
+        received = False
+        while True:
+            try:
+                _, csi_data = plot_queue.get_nowait()
+            except queue.Empty:
+                break
+            gap_count, cursor = update_buffers(y_buf, cursor, csi_data, minmax_lo, minmax_hi, gap_count)
+            received = True
+
+        if received:
+            txt = update_plot(line_list, y_buf, cursor, minmax_lo, minmax_hi, txt, gap_label)
+        return (*line_list, txt)
+
+    # FuncAnimation caches the background and blits only the returned artists;
+    # the reference keeps it alive while the window is open
+    anim = FuncAnimation(fig, update_frame, interval=int(PLOT_INTERVAL * 1000),
+                         blit=True, cache_frame_data=False)
+
+    # Close from a plain timer: closing inside the blitted animation callback
+    # swaps the canvas out before FuncAnimation finishes drawing the frame
+    def close_on_stop():
+        if stop_event.is_set():
+            stop_timer.stop()
+            anim.event_source.stop()
+            plt.close(fig)
+    stop_timer = fig.canvas.new_timer(interval=100)
+    stop_timer.add_callback(close_on_stop)
+    stop_timer.start()
+
+    capture_thread.start()
+    stdin_thread.start()
+    plt.show()
+
+    # Window closed, 's' entered or Ctrl+C: stop capturing
+    stop_event.set()
+    signal.signal(signal.SIGINT, previous_handler)
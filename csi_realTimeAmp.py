@@ -1,24 +1,17 @@
-import pcap
-import dpkt
-import keyboard
-import pandas as pd
-import numpy as np
+import csv
 import os
-import sys
-from datetime import datetime
+import queue
+import threading
 import time
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from multiprocessing import Process
-from matplotlib.artist import Artist
-from scapy.all import ARP, Ether, srp
+from datetime import datetime
+
+import numpy as np
 
-# Global configuration
-BANDWIDTH = 20
-NSUB = int(BANDWIDTH * 3.2)
-selected_mac = '5c0214fb6552'
-show_packet_length = 100
-GAP_PACKET_NUM = 20
+from csi_core import NSUB, selected_mac, process_csi_data, run_realtime_plot
+
+CSV_BATCH_SIZE = 64
+CSV_FLUSH_INTERVAL = 0.25  # seconds between CSV flushes
+NPY_MAX_ROWS = 1 << 20  # packets the .npy sidecar files can hold
 
 # Create CSI data folder
 CSI_FOLDER = 'csi_data'
@@ -26,184 +19,128 @@ if not os.path.exists(CSI_FOLDER):
     os.makedirs(CSI_FOLDER)
     print(f"Created directory: {CSI_FOLDER}")
 
-def get_mac():
-    """
-    Scans the network to find MAC addresses.
-    Returns the first MAC address found without colons.
-    """
-    target_ip = "192.168.1.1/16"
-    arp = ARP(pdst=target_ip)
-    ether = Ether(dst="ff:ff:ff:ff:ff:ff")
-    packet = ether / arp
-    result = srp(packet, timeout=3, verbose=False)[0]
-    
-    for sent, received in result:
-        print(f"IP: {received.psrc}, MAC: {received.hwsrc}")
-    return result[0][1].hwsrc.replace(":","") if result else None
-
-def truncate(num, n):
-    """
-    Truncates a number to n decimal places.
-    """
-    integer = int(num * (10 ** n)) / (10 ** n)
-    return float(integer)
-
 def setup_csv_file():
     """
     Creates a new CSV file with timestamp in the csi_data folder.
-    Returns the file path and DataFrame.
+    Writes the header row and returns the file name.
     """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"csi_data_{timestamp}.csv"
     filepath = os.path.join(CSI_FOLDER, filename)
     
-    # Create DataFrame with subcarrier columns
+    # Header with subcarrier columns, same writer settings as record_data
     columns = ['timestamp'] + [f'subcarrier_{i}' for i in range(NSUB)]
-    df = pd.DataFrame(columns=columns)
-    df.to_csv(filepath, index=False)
+    with open(filepath, 'w', newline='') as csv_file:
+        csv.writer(csv_file, lineterminator='\n').writerow(columns)
     
     print(f"Created new CSV file: {filepath}")
-    return filename, df
+    return filename
 
-def append_to_csv(filename, timestamp, csi_data):
+def npy_paths(csv_filepath):
     """
-    Appends new CSI data to the CSV file in the csi_data folder.
+    Returns the amplitude and timestamp .npy sidecar paths of a CSV file.
     """
-    filepath = os.path.join(CSI_FOLDER, filename)
-    # Create a new row with timestamp and CSI data
-    new_row = [timestamp] + csi_data
-    df = pd.DataFrame([new_row], columns=['timestamp'] + [f'subcarrier_{i}' for i in range(NSUB)])
-    
-    # Append to CSV without writing the header
-    df.to_csv(filepath, mode='a', header=False, index=False)
+    base = os.path.splitext(csv_filepath)[0]
+    return f'{base}.npy', f'{base}_timestamp.npy'
 
-def setup_plot():
-    """
-    Sets up the matplotlib plot for real-time visualization.
-    Returns the figure, axis, line list, and text object.
-    """
-    plt.ion()
-    fig, ax = plt.subplots(figsize=(12, 8))
-    
-    x = np.arange(0, show_packet_length, 1)
-    y_list = [[0 for _ in range(show_packet_length)] for _ in range(NSUB)]
-    line_list = []
-    
-    for y in y_list:
-        line, = ax.plot(x, y, alpha=0.5)
-        line_list.append(line)
-    
-    plt.title(f'{selected_mac}', fontsize=18)
-    plt.ylabel('Signal Amplitude', fontsize=16)
-    plt.xlabel('Packet', fontsize=16)
-    plt.ylim(0, 1500)
-    
-    txt = ax.text(40, 1600, 'Amp Min-Max Gap: None', fontsize=14)
-    
-    return fig, ax, line_list, txt, y_list
+def setup_npy_files(csv_filepath):
+    """
+    Creates memory-mapped .npy sidecars next to the CSV file so the
+    visualizer can load amplitudes without parsing text.
+    They are written under a .part suffix until finish_npy_files trims them.
+    Returns the (NPY_MAX_ROWS, NSUB) amplitude and timestamp arrays.
+    """
+    amp_path, ts_path = npy_paths(csv_filepath)
+    amp_npy = np.lib.format.open_memmap(f'{amp_path}.part', mode='w+',
+                                        dtype=np.float32, shape=(NPY_MAX_ROWS, NSUB))
+    ts_npy = np.lib.format.open_memmap(f'{ts_path}.part', mode='w+',
+                                       dtype='datetime64[us]', shape=(NPY_MAX_ROWS,))
+    return amp_npy, ts_npy
 
-def process_csi_data(csi, bandwidth):
+def finish_npy_files(csv_filepath, npy_arrays, rows):
     """
-    Processes raw CSI data into complex numbers and returns amplitude data.
+    Saves the first rows of the sidecars under their final names and removes
+    the full-size .part files. rows=None discards the sidecars, leaving the
+    CSV as the only record.
     """
-    nsub = int(bandwidth * 3.2)
-    
-    # Convert CSI bytes to numpy array
-    csi_np = np.frombuffer(csi, dtype=np.int16, count=nsub * 2)
-    csi_np = csi_np.reshape((1, nsub * 2))
-    
-    # Convert to complex numbers
-    csi_cmplx = np.fft.fftshift(csi_np[:1, ::2] + 1.j * csi_np[:1, 1::2], axes=(1,))
-    return list(np.abs(csi_cmplx)[0])
+    for path, arr in zip(npy_paths(csv_filepath), npy_arrays):
+        if rows is not None:
+            with open(path, 'wb') as f:
+                np.save(f, arr[:rows])
+        os.remove(f'{path}.part')
 
-def update_plot(line_list, y_list, csi_data, minmax, gap_count, txt, ax):
+def record_data(csv_filepath, npy_arrays, record_queue):
     """
-    Updates the plot with new CSI data and min-max gap information.
+    Recording thread: stores queued CSI data in the CSV file and the .npy
+    sidecars until None is received.
+    CSV rows are written in batches of CSV_BATCH_SIZE or every CSV_FLUSH_INTERVAL.
     """
-    for i, y in enumerate(y_list):
-        del y[0]
-        new_y = csi_data[i]
-        y.append(new_y)
-        line_list[i].set_xdata(np.arange(0, show_packet_length, 1))
-        line_list[i].set_ydata(y)
-        
-        # Update min-max values
-        if gap_count == 0:
-            minmax.append([new_y, new_y])
-        else:
-            if minmax[i][0] > new_y:
-                minmax[i][0] = new_y
-            if minmax[i][1] < new_y:
-                minmax[i][1] = new_y
-    
-    # Calculate and display gap
-    gap_list = [mm[1] - mm[0] for mm in minmax]
-    gap = max(gap_list)
+    amp_npy, ts_npy = npy_arrays
+    row = 0
+    overflow = False
     
-    Artist.remove(txt)
-    txt = ax.text(40, 1600, f'Amp Min-Max Gap: {gap}', fontsize=14)
+    # Keep a single buffered handle open instead of reopening the file per packet
+    with open(csv_filepath, 'a', buffering=1 << 20, newline='') as csv_file:
+        csv_writer = csv.writer(csv_file, lineterminator='\n')
+        pending = []
+        last_flush = time.monotonic()
+        
+        while True:
+            try:
+                item = record_queue.get(timeout=CSV_FLUSH_INTERVAL)
+            except queue.Empty:
+                pass
+            else:
+                if item is None:
+                    break
+                timestamp, csi_data = item
+                pending.append((timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"), *csi_data))
+                
+                if row < NPY_MAX_ROWS:
+                    amp_npy[row] = csi_data
+                    ts_npy[row] = timestamp
+                    row += 1
+                elif not overflow:
+                    # A truncated sidecar would hide later rows from the visualizer
+                    print(f"Warning: more than {NPY_MAX_ROWS} packets, "
+                          f"the .npy sidecars are dropped and only the CSV is recorded")
+                    overflow = True
+            
+            if len(pending) >= CSV_BATCH_SIZE or time.monotonic() - last_flush >= CSV_FLUSH_INTERVAL:
+                csv_writer.writerows(pending)
+                csv_file.flush()
+                pending.clear()
+                last_flush = time.monotonic()
+        
+        # Write the remaining rows before the file is closed
+        csv_writer.writerows(pending)
     
-    return txt, minmax, (gap_count + 1) % GAP_PACKET_NUM
+    finish_npy_files(csv_filepath, npy_arrays, None if overflow else row)
 
 def sniffing(nicname, mac_address):
     """
     Main function that captures and processes CSI data in real-time.
+    Capture and recording run on worker threads so a slow redraw
+    never stalls the sniffer; the main thread only drains the plot queue.
     """
-    print(f'Start Sniffing... @ {nicname}, UDP, Port 5500')
-    sniffer = pcap.pcap(name=nicname, promisc=True, immediate=True, timeout_ms=50)
-    sniffer.setfilter('udp and port 5500')
-    
     # Setup CSV file for recording
-    csv_filename, _ = setup_csv_file()
-    print(f"Recording CSI data to {os.path.join(CSI_FOLDER, csv_filename)}")
-    
-    before_ts = 0.0
-    fig, ax, line_list, txt, y_list = setup_plot()
-    minmax = []
-    gap_count = 0
-    idx = show_packet_length - 1
-    
-    for ts, pkt in sniffer:
-        # Skip duplicate timestamps
-        if int(ts) == int(before_ts):
-            cur_ts = truncate(ts, 1)
-            bef_ts = truncate(before_ts, 1)
-            if cur_ts == bef_ts:
-                before_ts = ts
-                continue
-        
-        # Process packet
-        eth = dpkt.ethernet.Ethernet(pkt)
-        ip = eth.data
-        udp = ip.data
-        
-        # Check MAC address
-        mac = udp.data[4:10].hex()
-        if mac != mac_address:
-            continue
-        
-        # Extract and process CSI data
-        csi = udp.data[18:]
-        bandwidth = ip.__hdr__[2][2]
-        csi_data = process_csi_data(csi, bandwidth)
-        
-        # Record to CSV
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-        append_to_csv(csv_filename, current_time, csi_data)
-        
-        # Update plot
-        idx += 1
-        txt, minmax, gap_count = update_plot(line_list, y_list, csi_data, minmax, gap_count, txt, ax)
-        
-        # Update display
-        fig.canvas.draw()
-        fig.canvas.flush_events()
-        before_ts = ts
-        
-        # Check for exit condition
-        if keyboard.is_pressed('s'):
-            print("Stop Collecting...")
-            exit()
+    csv_filename = setup_csv_file()
+    csv_filepath = os.path.join(CSI_FOLDER, csv_filename)
+    npy_arrays = setup_npy_files(csv_filepath)
+    print(f"Recording CSI data to {csv_filepath}")
+    
+    record_queue = queue.SimpleQueue()
+    record_thread = threading.Thread(target=record_data, args=(csv_filepath, npy_arrays, record_queue), daemon=True)
+    record_thread.start()
+    
+    try:
+        run_realtime_plot(nicname, mac_address, process_csi_data,
+                          ylabel='Signal Amplitude', ylim=(0, 1500), gap_label='Amp',
+                          extra_queues=(record_queue,))
+    finally:
+        # Window closed, 's' entered, Ctrl+C or an error: finish the recording
+        record_queue.put(None)
+        record_thread.join()
 
 if __name__ == '__main__':
     sniffing('wlan0', selected_mac)
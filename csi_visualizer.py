@@ -1,27 +1,49 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
 from matplotlib.widgets import Button
 import os
 from datetime import datetime
 import glob
+from collections import defaultdict
 
 class CSIVisualizer:
     def __init__(self):
         self.df = None
+        self._amp = None
+        self._ts = None
+        self._ts_num = None
         self.current_file = None
         self.fig = None
         self.ax = None
         self.current_plot_type = 'time_series'
         
     def load_data(self, filename):
-        """Load CSI data from CSV file"""
+        """Load CSI data from CSV file, or from its .npy sidecars when present"""
         try:
-            self.df = pd.read_csv(filename)
+            base = os.path.splitext(filename)[0]
+            amp_file = f'{base}.npy'
+            ts_file = f'{base}_timestamp.npy'
+            if os.path.exists(amp_file) and os.path.exists(ts_file):
+                # Sidecars are trimmed to the recorded rows when the capture ends
+                self.df = None
+                self._amp = np.load(amp_file, mmap_mode='r')
+                self._ts = np.load(ts_file, mmap_mode='r')
+            else:
+                # Fixed numeric schema: skip dtype inference, timestamps are parsed once below
+                self.df = pd.read_csv(filename,
+                                      dtype=defaultdict(lambda: np.float32, timestamp=str),
+                                      memory_map=True,
+                                      low_memory=False)
+                self._amp = self.df.iloc[:, 1:].to_numpy(dtype=np.float32, copy=False)  # Exclude timestamp column
+                self._ts = pd.to_datetime(self.df['timestamp']).to_numpy()
+            # Matplotlib date numbers, so plot switches skip the datetime conversion
+            self._ts_num = mdates.date2num(self._ts)
             self.current_file = filename
             print(f"Successfully loaded {filename}")
-            print(f"Data shape: {self.df.shape}")
-            print(f"Time range: {self.df['timestamp'].iloc[0]} to {self.df['timestamp'].iloc[-1]}")
+            print(f"Data shape: {self._amp.shape}")
+            print(f"Time range: {self._ts[0]} to {self._ts[-1]}")
             return True
         except Exception as e:
             print(f"Error loading file: {e}")
@@ -36,7 +58,7 @@ class CSIVisualizer:
 
     def plot_time_series(self):
         """Plot CSI data as time series"""
-        if self.df is None:
+        if self._amp is None:
             print("No data loaded")
             return
 
@@ -44,20 +66,22 @@ class CSIVisualizer:
         plt.clf()
         self.ax = self.fig.add_subplot(111)
         
-        # Convert timestamp to datetime
-        timestamps = pd.to_datetime(self.df['timestamp'])
+        amplitudes = self._amp
         
-        # Plot each subcarrier but only label some for the legend
-        num_subcarriers = len(self.df.columns) - 1  # Exclude timestamp column
+        # Plot all subcarriers in one call but only label some for the legend
+        num_subcarriers = amplitudes.shape[1]
         legend_interval = max(1, num_subcarriers // 10)  # Show about 10 subcarriers in legend
         
-        for i in range(1, len(self.df.columns)):
-            line = self.ax.plot(timestamps, self.df.iloc[:, i], alpha=0.5)
-            if (i-1) % legend_interval == 0:  # Only add label for some subcarriers
-                line[0].set_label(f'Subcarrier {i-1}')
+        lines = self.ax.plot(self._ts_num, amplitudes, alpha=0.5)
+        for i in range(0, num_subcarriers, legend_interval):
+            lines[i].set_label(f'Subcarrier {i}')
         
         self.ax.set_title('CSI Amplitude Time Series')
         self.ax.set_xlabel('Time')
+        # _ts_num are plain floats, so the date locator/formatter must be set explicitly
+        locator = mdates.AutoDateLocator()
+        self.ax.xaxis.set_major_locator(locator)
+        self.ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
         self.ax.set_ylabel('Amplitude')
         
         # Adjust legend position and size
@@ -75,7 +99,7 @@ class CSIVisualizer:
 
     def plot_heatmap(self):
         """Plot CSI data as a heatmap"""
-        if self.df is None:
+        if self._amp is None:
             print("No data loaded")
             return
 
@@ -83,11 +107,19 @@ class CSIVisualizer:
         plt.clf()
         self.ax = self.fig.add_subplot(111)
         
-        # Prepare data for heatmap
-        data = self.df.iloc[:, 1:].values.T  # Exclude timestamp column
+        # Prepare data for heatmap, max-pooling time down to ~2 samples per pixel
+        amplitudes = self._amp
+        num_packets, num_subcarriers = amplitudes.shape
+        target = 2 * int(self.fig.get_figwidth() * self.fig.dpi)
+        if num_packets > target:
+            k = -(-num_packets // target)  # Packets per bin, rounded up so no bin count exceeds target
+            amplitudes = np.maximum.reduceat(amplitudes, np.arange(0, num_packets, k), axis=0)
+        data = amplitudes.T
         
-        # Create heatmap
-        im = self.ax.imshow(data, aspect='auto', cmap='viridis')
+        # Create heatmap, keeping the axes in original packet/subcarrier indices
+        im = self.ax.imshow(data, aspect='auto', cmap='viridis',
+                            interpolation='nearest', origin='lower',
+                            extent=(-0.5, num_packets - 0.5, -0.5, num_subcarriers - 0.5))
         
         # Add colorbar
         plt.colorbar(im, ax=self.ax, label='Amplitude')
@@ -100,7 +132,7 @@ class CSIVisualizer:
 
     def plot_statistics(self):
         """Plot statistical analysis of CSI data"""
-        if self.df is None:
+        if self._amp is None:
             print("No data loaded")
             return
 
@@ -109,8 +141,9 @@ class CSIVisualizer:
         self.ax = self.fig.add_subplot(111)
         
         # Calculate statistics
-        means = self.df.iloc[:, 1:].mean()
-        stds = self.df.iloc[:, 1:].std()
+        amplitudes = self._amp
+        means = amplitudes.mean(axis=0)
+        stds = amplitudes.std(axis=0, ddof=1)  # Sample std, as pandas computed it
         
         # Create bar plot
         x = np.arange(len(means))